@@ -0,0 +1,260 @@
+"""
+End-to-end performance benchmarks for the main.app routes.
+
+Seeds synthetic banks, drives the real routes with concurrent in-process
+clients and records p50/p99 latency, throughput and peak RSS per scenario.
+Each scenario runs in its own subprocess against the seeded database, so peak
+RSS belongs to that scenario alone. Results are compared against a JSON
+baseline; any metric that regresses by more than --threshold fails the run
+(exit code 1). p99 is only gated for scenarios with at least MIN_P99_SAMPLES
+requests, since below that it is just the slowest request.
+
+Run (from the repo root):
+    python -m benchmarks.run --sizes 10000,100000
+    python -m benchmarks.run --database-url postgresql://localhost/qna_bench --sizes 10000
+    python -m benchmarks.run --sizes 10000 --update-baseline
+
+The database is wiped and reseeded, so never point it at real data.
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+DEFAULT_DATABASE_URL = "sqlite:///./bench.sqlite"
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+MIN_P99_SAMPLES = 100
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=os.getenv("BENCH_DATABASE_URL", DEFAULT_DATABASE_URL))
+    parser.add_argument("--sizes", default="10000", help="comma separated bank sizes, e.g. 10000,100000,1000000")
+    parser.add_argument("--categories", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent in-process clients")
+    parser.add_argument("--requests", type=int, default=400, help="requests per scenario")
+    parser.add_argument("--scenarios", default=None, help="comma separated subset of scenarios to run")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--threshold", type=float, default=0.20, help="allowed regression, 0.20 = 20%%")
+    parser.add_argument("--update-baseline", action="store_true", help="write results as the new baseline")
+    # Internal: run one scenario against an already seeded bank and print its metrics as JSON
+    parser.add_argument("--worker", metavar="SCENARIO", help=argparse.SUPPRESS)
+    parser.add_argument("--size", type=int, help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+# Each scenario builds one request from (rng, bank) -> (method, url, kwargs)
+def list_filtered(rng, bank):
+    params = {"category_id": rng.choice(bank["category_ids"]), "is_done": rng.choice(["true", "false"]), "limit": 20}
+    return "GET", "/qnas/", {"params": params}
+
+def deep_page(rng, bank):
+    skip = max(bank["size"] - rng.randint(20, 1000), 0)
+    return "GET", "/qnas/", {"params": {"skip": skip, "limit": 20}}
+
+def search(rng, bank):
+    from benchmarks.seed import TOPICS
+    return "GET", "/qnas/", {"params": {"search": rng.choice(TOPICS), "limit": 20}}
+
+def draw(rng, bank):
+    params = {"category_id": rng.choice(bank["category_ids"]), "is_done": "false", "n": 10}
+    return "GET", "/qnas/draw", {"params": params}
+
+def toggle_bookmark(rng, bank):
+    return "PATCH", f"/qnas/{rng.randint(1, bank['size'])}/bookmark", {}
+
+def mark_done(rng, bank):
+    return "PATCH", f"/qnas/{rng.randint(1, bank['size'])}/mark", {"params": {"done": rng.choice(["true", "false"])}}
+
+def import_json(rng, bank):
+    from benchmarks.seed import make_qna
+    rows = [make_qna(i, bank["category_ids"], rng) for i in range(100)]
+    body = io.BytesIO(json.dumps(rows).encode())
+    return "POST", "/bulk/import/json", {"files": {"file": ("bank.json", body, "application/json")}}
+
+def export_json(rng, bank):
+    return "GET", "/bulk/export/json", {}
+
+SCENARIOS = {
+    "list_filtered": (list_filtered, 1.0),
+    "deep_page": (deep_page, 1.0),
+    "search": (search, 0.25),
+    "draw": (draw, 1.0),
+    "toggle_bookmark": (toggle_bookmark, 1.0),
+    "mark_done": (mark_done, 1.0),
+    "import_json": (import_json, 0.1),
+    # Full-table export is heavy; a handful of calls is enough to see a trend
+    "export_json": (export_json, 0.02),
+}
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def percentile(samples: list, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * pct), len(ordered) - 1)]
+
+
+async def run_scenario(client, build, bank, total: int, concurrency: int, seed: int) -> dict:
+    latencies, errors = [], 0
+    remaining = iter(range(total))
+
+    async def worker(worker_id: int):
+        nonlocal errors
+        rng = random.Random(seed * 1000 + worker_id)
+        for _ in remaining:
+            method, url, kwargs = build(rng, bank)
+            start = time.perf_counter()
+            res = await client.request(method, url, **kwargs)
+            latencies.append(time.perf_counter() - start)
+            if res.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(w) for w in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+async def run_worker(args) -> dict:
+    """
+    Warm up and measure one scenario in this (fresh) process.
+    """
+    import httpx
+    from main import app
+    from db import engine
+    from models import CategoryORM
+
+    with engine.connect() as conn:
+        category_ids = [row.id for row in conn.execute(CategoryORM.__table__.select())]
+    bank = {"size": args.size, "category_ids": category_ids}
+
+    build, weight = SCENARIOS[args.worker]
+    total = max(int(args.requests * weight), args.concurrency)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # Warm up pools and caches so the first requests don't skew p99
+        await run_scenario(client, build, bank, args.concurrency, args.concurrency, seed=-args.size)
+        return await run_scenario(client, build, bank, total, args.concurrency, seed=args.size)
+
+
+def run_size(size: int, args, scenarios: list) -> dict:
+    from benchmarks.seed import seed_bank
+
+    started = time.perf_counter()
+    seed_bank(size, categories=args.categories)
+    print(f"[{size}] seeded in {time.perf_counter() - started:.1f}s")
+
+    results = {}
+    for name in scenarios:
+        cmd = [
+            sys.executable, "-m", "benchmarks.run",
+            "--worker", name, "--size", str(size),
+            "--database-url", args.database_url,
+            "--concurrency", str(args.concurrency),
+            "--requests", str(args.requests),
+        ]
+        proc = subprocess.run(cmd, capture_output=True, text=True)
+        if proc.returncode != 0:
+            raise RuntimeError(f"scenario {name} failed:\n{proc.stderr}")
+        results[name] = r = json.loads(proc.stdout.strip().splitlines()[-1])
+        print(f"[{size}] {name:16} p50={r['p50_ms']:8.2f}ms p99={r['p99_ms']:8.2f}ms "
+              f"{r['throughput_rps']:8.1f} rps rss={r['peak_rss_mb']}MB errors={r['errors']}")
+    return results
+
+
+# Lower is better for these, higher is better for throughput
+LOWER_IS_BETTER = ("p50_ms", "p99_ms", "peak_rss_mb")
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """
+    Return a message for every metric that regressed more than `threshold` vs the baseline.
+    """
+    regressions = []
+    for key, scenarios in results.items():
+        for name, metrics in scenarios.items():
+            base = baseline.get(key, {}).get(name)
+            if not base:
+                continue
+            for metric in LOWER_IS_BETTER:
+                if metric == "p99_ms" and min(metrics["requests"], base.get("requests", 0)) < MIN_P99_SAMPLES:
+                    continue
+                if base.get(metric) and metrics[metric] > base[metric] * (1 + threshold):
+                    regressions.append(f"{key}/{name} {metric}: {base[metric]} -> {metrics[metric]}")
+            if base.get("throughput_rps") and metrics["throughput_rps"] < base["throughput_rps"] * (1 - threshold):
+                regressions.append(f"{key}/{name} throughput_rps: {base['throughput_rps']} -> {metrics['throughput_rps']}")
+            if metrics["errors"] > base.get("errors", 0):
+                regressions.append(f"{key}/{name} errors: {base.get('errors', 0)} -> {metrics['errors']}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    # db.py reads DATABASE_URL at import time
+    os.environ["DATABASE_URL"] = args.database_url
+    if args.worker:
+        print(json.dumps(asyncio.run(run_worker(args))))
+        return 0
+
+    from db import engine
+
+    backend = engine.dialect.name
+    scenarios = args.scenarios.split(",") if args.scenarios else list(SCENARIOS)
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        print(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+        return 2
+
+    results = {}
+    for size in (int(s) for s in args.sizes.split(",")):
+        results[f"{backend}/{size}"] = run_size(size, args, scenarios)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    if args.update_baseline:
+        baseline.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2)
+        print(f"Baseline updated: {args.baseline}")
+        return 0
+
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"Regressions beyond {args.threshold:.0%}:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print("No regressions against baseline" if baseline else "No baseline yet, run with --update-baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
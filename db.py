@@ -1,25 +1,200 @@
-from sqlalchemy import create_engine, text
+from fastapi import Request, Response
+from sqlalchemy import create_engine, text, inspect
 from sqlalchemy.orm import sessionmaker, declarative_base
 import os
+import threading
+import time
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 # DATABASE_URL = "sqlite:///./db.sqlite"
+# Optional read replica (Postgres standby, or a second SQLite file locally)
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL")
 
-engine = create_engine(DATABASE_URL)
+# After a write, that client's reads stay on the primary for this long
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", 5))
+MAX_REPLICA_LAG_SECONDS = float(os.getenv("MAX_REPLICA_LAG_SECONDS", 2))
+REPLICA_CHECK_INTERVAL = float(os.getenv("REPLICA_CHECK_INTERVAL", 5))
+LAST_WRITE_COOKIE = "last_write"
+# Same value as the cookie, for clients that can't send cookies cross-site and echo it instead
+LAST_WRITE_HEADER = "X-Last-Write"
+
+def _create_engine(url: str, **kwargs):
+    connect_args = {"check_same_thread": False} if url.startswith("sqlite") else {}
+    return create_engine(url, connect_args=connect_args, **kwargs)
+
+engine = _create_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# pre_ping so a replica that went away is noticed per connection, not per request failure
+read_engine = _create_engine(DATABASE_READ_URL, pool_pre_ping=True) if DATABASE_READ_URL else None
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine) if read_engine else None
 Base = declarative_base()
 
-def get_db():
+def get_db(request: Request, response: Response):
+    """
+    Session on the primary, for mutations. Marks the client as a recent writer
+    so its next reads are served from the primary too.
+
+    The mark goes out both as the last_write cookie and as the X-Last-Write
+    response header. The deployed frontend is on another site, so the cookie only
+    comes back if it fetches with `credentials: "include"` (it's then sent as
+    SameSite=None; Secure over HTTPS); otherwise it must echo the header value
+    on its following requests.
+    """
+    stamp = str(time.time())
+    secure = _scheme(request) == "https"
+    response.set_cookie(
+        LAST_WRITE_COOKIE, stamp,
+        max_age=int(READ_YOUR_WRITES_SECONDS) + 1, httponly=True,
+        # Browsers drop SameSite=None cookies that aren't Secure, so plain http keeps lax
+        samesite="none" if secure and _cross_site(request) else "lax",
+        secure=secure,
+    )
+    response.headers[LAST_WRITE_HEADER] = stamp
+    yield from get_primary_db()
+
+def _scheme(request: Request) -> str:
+    # Behind the hosting proxy the app itself is reached over plain http
+    return request.headers.get("x-forwarded-proto", request.url.scheme).split(",")[0].strip()
+
+def _cross_site(request: Request) -> bool:
+    origin = request.headers.get("origin")
+    return origin is not None and origin != f"{_scheme(request)}://{request.url.netloc}"
+
+def get_primary_db():
+    """
+    Session on the primary for reads that must never see replica lag.
+    """
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
 
+def session_role(db) -> str:
+    """
+    "replica" or "primary": which database a session reads from. Part of any
+    cache or single-flight key for results read through get_read_db, so a sticky
+    client never shares a replica read.
+    """
+    return "primary" if db.get_bind() is engine else "replica"
+
+def get_read_db(request: Request):
+    """
+    Session for read-only handlers: the replica when one is configured, healthy
+    and the client hasn't written recently, the primary otherwise.
+    """
+    db = ReadSessionLocal() if _use_replica(request) else SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def _use_replica(request: Request) -> bool:
+    if ReadSessionLocal is None:
+        return False
+    last_write = 0.0
+    for value in (request.cookies.get(LAST_WRITE_COOKIE), request.headers.get(LAST_WRITE_HEADER)):
+        try:
+            last_write = max(last_write, float(value or 0))
+        except ValueError:
+            pass
+    if time.time() - last_write < READ_YOUR_WRITES_SECONDS:
+        return False
+    return replica_healthy()
+
+_replica_state = {"healthy": False, "checked_at": None}
+_replica_lock = threading.Lock()
+
+def replica_healthy() -> bool:
+    """
+    Cached probe of the replica: down or lagging more than MAX_REPLICA_LAG_SECONDS
+    means reads fall back to the primary until the next check.
+    """
+    checked_at = _replica_state["checked_at"]
+    if checked_at is not None and time.monotonic() - checked_at < REPLICA_CHECK_INTERVAL:
+        return _replica_state["healthy"]
+    # Only one thread probes; the rest use the last known state meanwhile
+    if not _replica_lock.acquire(blocking=False):
+        return _replica_state["healthy"]
+    try:
+        _replica_state["healthy"] = _replica_lag() <= MAX_REPLICA_LAG_SECONDS
+    except Exception:
+        _replica_state["healthy"] = False
+    finally:
+        _replica_state["checked_at"] = time.monotonic()
+        _replica_lock.release()
+    return _replica_state["healthy"]
+
+def _replica_lag() -> float:
+    with read_engine.connect() as conn:
+        if read_engine.dialect.name != "postgresql":
+            conn.execute(text("SELECT 1"))
+            return 0.0
+        # Fully replayed standby (or no standby at all) counts as zero lag
+        lag = conn.execute(text("""
+            SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END
+        """)).scalar()
+        return float(lag or 0)
+
 def init_db():
     Base.metadata.create_all(bind=engine)
+    _add_late_columns()
+    _add_late_indexes()
+    _init_change_counter()
     # _init_fts()
 
+# Columns added to models after their tables already existed in deployed databases:
+# table -> column -> (type, backfill value)
+LATE_COLUMNS = {
+    "categories": {
+        "created_at": ("TIMESTAMP", "CURRENT_TIMESTAMP"),
+        "updated_at": ("TIMESTAMP", "CURRENT_TIMESTAMP"),
+        "change_seq": ("INTEGER", "0"),
+    },
+    "qnas": {
+        "created_at": ("TIMESTAMP", "CURRENT_TIMESTAMP"),
+        "updated_at": ("TIMESTAMP", "CURRENT_TIMESTAMP"),
+        "change_seq": ("INTEGER", "0"),
+    },
+    "tombstones": {
+        "change_seq": ("INTEGER", "0"),
+    },
+}
+LATE_INDEXES = (
+    "ix_categories_updated_at",
+    "ix_qnas_updated_at",
+    "ix_categories_change_seq",
+    "ix_qnas_change_seq",
+    "ix_tombstones_change_seq",
+    "ix_qnas_category_done",
+)
+
+def _add_late_columns():
+    """
+    create_all() won't alter existing tables, so add and backfill newer columns.
+    """
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table, late in LATE_COLUMNS.items():
+            columns = {c["name"] for c in inspector.get_columns(table)}
+            for column, (type_, backfill) in late.items():
+                if column not in columns:
+                    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {type_}"))
+                    conn.execute(text(f"UPDATE {table} SET {column} = {backfill}"))
+
+def _add_late_indexes():
+    for table in Base.metadata.tables.values():
+        for index in table.indexes:
+            if index.name in LATE_INDEXES:
+                index.create(bind=engine, checkfirst=True)
+
+def _init_change_counter(bind=None):
+    counter = Base.metadata.tables["change_counter"]
+    with (bind or engine).begin() as conn:
+        if conn.execute(counter.select().where(counter.c.id == 1)).first() is None:
+            conn.execute(counter.insert().values(id=1, seq=0, pruned_seq=0))
+
 # def _init_fts():
 #     with engine.connect() as conn:
 #         # Create FTS5 virtual table
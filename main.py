@@ -1,7 +1,7 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from db import init_db
-from routers import categories, qnas, bulk
+from routers import categories, qnas, bulk, sync, changes
 
 app = FastAPI(title="QnA Backend - FastAPI",debug=True)
 
@@ -12,17 +12,26 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Read-your-writes marker the frontend echoes back (see db.get_db)
+    expose_headers=["X-Last-Write"],
 )
 
 @app.on_event("startup")
 def startup_event():
     init_db()
+    try:
+        # Registers the commit hook that keeps the shared vector index in step with writes
+        import services.embeddings  # noqa: F401
+    except ImportError:
+        pass
 
 # Routers
 app.include_router(categories.router)
 app.include_router(qnas.router)
 # app.include_router(ai.router)
 app.include_router(bulk.router)
+app.include_router(sync.router)
+app.include_router(changes.router)
 
 @app.get("/")
 def root():
@@ -1,11 +1,21 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Text
-from sqlalchemy.orm import relationship
+from datetime import datetime, timezone
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Text, DateTime, Index, event, select, update
+from sqlalchemy.orm import relationship, Session
 from db import Base
 
+
+def utcnow():
+    # Naive UTC so SQLite and Postgres store the same values
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
 class CategoryORM(Base):
     __tablename__ = "categories"
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), unique=True, nullable=False)
+    created_at = Column(DateTime, default=utcnow, nullable=False)
+    updated_at = Column(DateTime, default=utcnow, onupdate=utcnow, nullable=False, index=True)
+    change_seq = Column(Integer, default=0, nullable=False, index=True)
     qnas = relationship("QnaORM", back_populates="category", cascade="delete")
 
 class QnaORM(Base):
@@ -16,4 +26,63 @@ class QnaORM(Base):
     is_done = Column(Boolean, default=False, index=True)
     bookmark = Column(Boolean, default=False, index=True)
     category_id = Column(Integer, ForeignKey("categories.id"), nullable=True, index=True)
+    created_at = Column(DateTime, default=utcnow, nullable=False)
+    updated_at = Column(DateTime, default=utcnow, onupdate=utcnow, nullable=False, index=True)
+    change_seq = Column(Integer, default=0, nullable=False, index=True)
     category = relationship("CategoryORM", back_populates="qnas")
+
+    # Covers the per-filter id scans behind /qnas/draw
+    __table_args__ = (Index("ix_qnas_category_done", "category_id", "is_done", "id"),)
+
+class TombstoneORM(Base):
+    __tablename__ = "tombstones"
+    id = Column(Integer, primary_key=True, index=True)
+    entity = Column(String(20), nullable=False)   # "qna" | "category"
+    entity_id = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime, default=utcnow, nullable=False, index=True)
+    change_seq = Column(Integer, default=0, nullable=False, index=True)
+
+class ChangeCounterORM(Base):
+    """
+    Single row (id=1) holding the last change_seq handed out, and the newest
+    change_seq whose tombstones were pruned.
+    """
+    __tablename__ = "change_counter"
+    id = Column(Integer, primary_key=True)
+    seq = Column(Integer, default=0, nullable=False)
+    pruned_seq = Column(Integer, default=0, nullable=False)
+
+
+TOMBSTONE_ENTITIES = {QnaORM: "qna", CategoryORM: "category"}
+
+def _next_change_seq(session) -> int:
+    # One seq per transaction. The UPDATE keeps the counter row locked until commit,
+    # so seqs become visible in commit order and a /sync token can never get ahead
+    # of a write that was flushed but not yet committed.
+    seq = session.info.get("change_seq")
+    if seq is None:
+        counter = ChangeCounterORM.__table__
+        conn = session.connection()
+        conn.execute(update(counter).where(counter.c.id == 1).values(seq=counter.c.seq + 1))
+        seq = session.info["change_seq"] = conn.execute(select(counter.c.seq).where(counter.c.id == 1)).scalar_one()
+    return seq
+
+@event.listens_for(Session, "before_flush")
+def _stamp_changes(session, flush_context, instances):
+    changed = [obj for obj in session.new if type(obj) in TOMBSTONE_ENTITIES]
+    changed += [obj for obj in session.dirty if type(obj) in TOMBSTONE_ENTITIES and session.is_modified(obj)]
+    deleted = [obj for obj in session.deleted if type(obj) in TOMBSTONE_ENTITIES]
+    if not changed and not deleted:
+        return
+
+    seq = _next_change_seq(session)
+    for obj in changed:
+        obj.change_seq = seq
+    # Covers direct deletes and the category -> qnas cascade
+    for obj in deleted:
+        session.add(TombstoneORM(entity=TOMBSTONE_ENTITIES[type(obj)], entity_id=obj.id, change_seq=seq))
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _reset_change_seq(session):
+    session.info.pop("change_seq", None)
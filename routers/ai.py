@@ -2,8 +2,9 @@ from fastapi import APIRouter, HTTPException, Depends
 import os, requests
 from dotenv import load_dotenv
 from sqlalchemy.orm import Session
-from db import get_db
+from db import get_read_db, session_role
 from models import QnaORM
+from services.concurrency import flights, summarize_limiter
 
 
 load_dotenv()
@@ -15,8 +16,8 @@ HEADERS = {"Authorization": f"Bearer {HF_TOKEN}"} if HF_TOKEN else {}
 HF_SUMMARIZER = "facebook/bart-large-cnn"
 
 
-@router.post("/summarize/{qna_id}")
-def summarize_qna(qna_id: int, db: Session = Depends(get_db)):
+@router.post("/summarize/{qna_id}", dependencies=[Depends(summarize_limiter)])
+def summarize_qna(qna_id: int, db: Session = Depends(get_read_db)):
     """
     Summarize an existing QnA answer into a shorter version using HuggingFace Bart.
     """
@@ -29,7 +30,11 @@ def summarize_qna(qna_id: int, db: Session = Depends(get_db)):
 
     payload = {"inputs": qna.answer}
     url = f"https://api-inference.huggingface.co/models/{HF_SUMMARIZER}"
-    res = requests.post(url, headers=HEADERS, json=payload, timeout=60)
+    # Concurrent requests for the same answer share one HF call
+    res = flights.do(
+        ("summarize", qna_id, qna.answer, session_role(db)),
+        lambda: requests.post(url, headers=HEADERS, json=payload, timeout=60),
+    )
 
     if res.status_code != 200:
         raise HTTPException(status_code=500, detail=f"HuggingFace error: {res.text}")
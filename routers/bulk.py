@@ -1,8 +1,9 @@
 from fastapi import APIRouter, Depends, UploadFile, HTTPException
 from sqlalchemy.orm import Session
-from db import get_db
+from db import get_db, get_read_db, session_role
 from models import QnaORM, CategoryORM
 from schemas import QnaRead
+from services.concurrency import flights, export_limiter
 import json
 import csv
 from io import StringIO
@@ -10,24 +11,28 @@ from io import StringIO
 router = APIRouter(prefix="/bulk", tags=["Bulk Import/Export"])
 
 # ✅ Export all QnAs as JSON
-@router.get("/export/json")
-def export_qnas_json(db: Session = Depends(get_db)):
-    qnas = db.query(QnaORM).all()
-    return [QnaRead.from_orm(q).dict() for q in qnas]
+@router.get("/export/json", dependencies=[Depends(export_limiter)])
+def export_qnas_json(db: Session = Depends(get_read_db)):
+    def export():
+        qnas = db.query(QnaORM).all()
+        return [QnaRead.from_orm(q).dict() for q in qnas]
+    return flights.do(("export", "json", session_role(db)), export)
 
 
 # ✅ Export all QnAs as CSV
-@router.get("/export/csv")
-def export_qnas_csv(db: Session = Depends(get_db)):
-    qnas = db.query(QnaORM).all()
-    output = StringIO()
-    writer = csv.writer(output)
-    writer.writerow(["id", "question", "answer", "is_done", "bookmark", "category_id"])
+@router.get("/export/csv", dependencies=[Depends(export_limiter)])
+def export_qnas_csv(db: Session = Depends(get_read_db)):
+    def export():
+        qnas = db.query(QnaORM).all()
+        output = StringIO()
+        writer = csv.writer(output)
+        writer.writerow(["id", "question", "answer", "is_done", "bookmark", "category_id"])
 
-    for q in qnas:
-        writer.writerow([q.id, q.question, q.answer, q.is_done, q.bookmark, q.category_id])
+        for q in qnas:
+            writer.writerow([q.id, q.question, q.answer, q.is_done, q.bookmark, q.category_id])
 
-    return {"csv": output.getvalue()}
+        return {"csv": output.getvalue()}
+    return flights.do(("export", "csv", session_role(db)), export)
 
 
 # ✅ Import QnAs from JSON file
@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from db import get_db
+from db import get_db, get_read_db
 from models import CategoryORM
 from schemas import CategoryCreate, CategoryRead
 from typing import List
@@ -19,11 +19,11 @@ def create_category(category: CategoryCreate, db: Session = Depends(get_db)):
     return db_cat
 
 @router.get("/", response_model=List[CategoryRead])
-def list_categories(db: Session = Depends(get_db)):
+def list_categories(db: Session = Depends(get_read_db)):
     return db.query(CategoryORM).all()
 
 @router.get("/{category_id}", response_model=CategoryRead)
-def get_category(category_id: int, db: Session = Depends(get_db)):
+def get_category(category_id: int, db: Session = Depends(get_read_db)):
     cat = db.query(CategoryORM).get(category_id)
     if not cat:
         raise HTTPException(status_code=404, detail="Category not found")
@@ -0,0 +1,46 @@
+import asyncio
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from pydantic import ValidationError
+from typing import Optional
+from schemas import ChangeFilter
+from services.changes import feed
+
+router = APIRouter(prefix="/ws", tags=["Changes"])
+
+@router.websocket("/changes")
+async def changes_feed(websocket: WebSocket, category_id: Optional[int] = None, bookmark: Optional[bool] = None):
+    """
+    Push batched created/updated/deleted events for QnAs and categories.
+    Clients can narrow the feed by sending {"category_id": ..., "bookmark": ...}
+    (invalid messages get {"type": "error"} back and are ignored);
+    on {"type": "resync"} they fell behind and should catch up via /sync.
+    Each event carries the `seq` it was committed at. Changes made through other
+    workers arrive within CHANGE_FEED_TAIL_INTERVAL as "updated"/"deleted" events
+    flagged "remote": true, which are create-or-update and skip the filters.
+    """
+    await websocket.accept()
+    sub = feed.subscribe(category_id=category_id, bookmark=bookmark)
+
+    async def sender():
+        while True:
+            await websocket.send_json(await sub.queue.get())
+
+    send_task = asyncio.create_task(sender())
+    try:
+        while True:
+            try:
+                filters = ChangeFilter.model_validate_json(await websocket.receive_text())
+            except ValidationError as e:
+                # Goes through the subscriber queue so only the sender task writes to the socket
+                if not sub.queue.full():
+                    sub.queue.put_nowait({"type": "error", "detail": e.errors(include_url=False, include_context=False, include_input=False)})
+                continue
+            if "category_id" in filters.model_fields_set:
+                sub.category_id = filters.category_id
+            if "bookmark" in filters.model_fields_set:
+                sub.bookmark = filters.bookmark
+    except WebSocketDisconnect:
+        pass
+    finally:
+        send_task.cancel()
+        feed.unsubscribe(sub)
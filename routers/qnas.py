@@ -1,12 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
-from db import get_db
+from db import get_db, get_read_db, session_role
 from models import QnaORM, CategoryORM
-from schemas import QnaCreate, QnaRead, QnaUpdate
+from schemas import QnaCreate, QnaRead, QnaUpdate, SearchBatchRequest, SearchBatchResult
 from typing import List, Optional
 from sqlalchemy import text
 from services.search import simple_search
-# from services.embeddings import add_to_index, update_in_index, remove_from_index,semantic_search
+from services.concurrency import flights, search_limiter
+from services.draw import draw
+# from services.embeddings import semantic_search
 
 router = APIRouter(prefix="/qnas", tags=["QnAs"])
 
@@ -25,7 +27,6 @@ def create_qna(payload: QnaCreate, db: Session = Depends(get_db)):
     db.add(db_q)
     db.commit()
     db.refresh(db_q)
-    # add_to_index(db_q)
     return db_q
 
 
@@ -62,7 +63,15 @@ def format_answer(answer: str) -> str:
 
     return answer.strip()
 
-@router.get("/", response_model=List[QnaRead])
+async def search_admission(search: Optional[str] = None):
+    # Only searches go through the limiter; plain filtered listing stays cheap
+    if not search:
+        yield
+        return
+    async with search_limiter.admit():
+        yield
+
+@router.get("/", response_model=List[QnaRead], dependencies=[Depends(search_admission)])
 def list_qnas(
     category_id: Optional[int] = None,
     is_done: Optional[bool] = None,
@@ -70,7 +79,7 @@ def list_qnas(
     search: Optional[str] = None,
     skip: int = 0,
     limit: int = 20,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     # Semantic search first
     if search:
@@ -78,8 +87,12 @@ def list_qnas(
         # results = semantic_search(search, db, top_k=limit)
         if results:   # ✅ semantic found results
             return results
-        # fallback to LIKE if semantic empty
-        return simple_search(db, search)[skip: skip+limit]
+        # fallback to LIKE if semantic empty; identical concurrent searches share one scan
+        matches = flights.do(
+            ("search", search, session_role(db)),
+            lambda: [QnaRead.model_validate(q) for q in simple_search(db, search)],
+        )
+        return matches[skip: skip+limit]
 
     # No search → just normal filtering
     query = db.query(QnaORM)
@@ -93,8 +106,43 @@ def list_qnas(
     return query.order_by(QnaORM.id.desc()).offset(skip).limit(limit).all()
 
 
+@router.post("/search/batch", response_model=List[SearchBatchResult], dependencies=[Depends(search_limiter)])
+def search_batch(payload: SearchBatchRequest, db: Session = Depends(get_read_db)):
+    """
+    Semantic search for many queries sharing the same filters.
+    """
+    try:
+        # Imported lazily: loads the embedding model and needs faiss installed
+        from services.embeddings import semantic_search_batch
+    except ImportError:
+        raise HTTPException(status_code=501, detail="Semantic search dependencies missing, batch search disabled")
+
+    hits = semantic_search_batch(
+        payload.queries,
+        db,
+        top_k=payload.top_k,
+        category_id=payload.category_id,
+        is_done=payload.is_done,
+        bookmark=payload.bookmark,
+    )
+    return [{"query": q, "results": results} for q, results in zip(payload.queries, hits)]
+
+
+@router.get("/draw", response_model=List[QnaRead])
+def draw_qnas(
+    category_id: Optional[int] = None,
+    is_done: Optional[bool] = None,
+    n: int = Query(1, ge=1, le=50),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Random practice questions: `n` distinct QnAs drawn uniformly from the filter.
+    """
+    return draw(db, n, category_id=category_id, is_done=is_done)
+
+
 @router.get("/{qna_id}", response_model=QnaRead)
-def get_qna(qna_id: int, db: Session = Depends(get_db)):
+def get_qna(qna_id: int, db: Session = Depends(get_read_db)):
     q = db.query(QnaORM).get(qna_id)
     if not q:
         raise HTTPException(status_code=404, detail="QnA not found")
@@ -115,7 +163,6 @@ def update_qna(qna_id: int, payload: QnaUpdate, db: Session = Depends(get_db)):
 
     db.commit()
     db.refresh(q)
-    # update_in_index(q)
     return q
 
 
@@ -127,7 +174,6 @@ def delete_qna(qna_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="QnA not found")
     db.delete(q)
     db.commit()
-    # remove_from_index(q.id)
 
 @router.patch("/{qna_id}/bookmark", response_model=QnaRead)
 def toggle_bookmark(qna_id: int, db: Session = Depends(get_db)):
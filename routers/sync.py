@@ -0,0 +1,79 @@
+import os
+import time
+from datetime import timedelta
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from db import get_primary_db
+from models import QnaORM, CategoryORM, TombstoneORM, ChangeCounterORM, utcnow
+from schemas import SyncResponse
+from typing import Optional
+
+router = APIRouter(prefix="/sync", tags=["Sync"])
+
+TOMBSTONE_RETENTION = timedelta(days=float(os.getenv("TOMBSTONE_RETENTION_DAYS", 30)))
+PRUNE_INTERVAL = 3600
+_last_prune = {"at": None}
+
+def prune_tombstones(db: Session):
+    """
+    Drop tombstones older than the retention window. Tokens from before the
+    newest pruned tombstone can no longer be served as a delta.
+    """
+    cutoff = utcnow() - TOMBSTONE_RETENTION
+    pruned = db.query(func.max(TombstoneORM.change_seq)).filter(TombstoneORM.deleted_at < cutoff).scalar()
+    if pruned is None:
+        return
+    # Prune by seq, not time, so every tombstone <= pruned_seq is gone and every later one kept
+    db.query(TombstoneORM).filter(TombstoneORM.change_seq <= pruned).delete(synchronize_session=False)
+    counter = db.get(ChangeCounterORM, 1)
+    counter.pruned_seq = max(counter.pruned_seq, pruned)
+    db.commit()
+
+@router.get("", response_model=SyncResponse)
+def sync(since: Optional[str] = None, db: Session = Depends(get_primary_db)):
+    """
+    Return categories/QnAs changed and rows deleted after `since`.
+    Without a token the full table is returned (initial sync). Pass the
+    returned `next_token` on the next call to only get newer changes; if
+    `full_resync` comes back true the token was too old and the response is
+    a full snapshot instead.
+    Stays on the primary: a lagging replica would hand out tokens past rows it
+    hasn't replayed yet, and those changes would never be synced.
+    """
+    since_seq = None
+    if since is not None:
+        try:
+            since_seq = int(since)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid sync token")
+
+    if _last_prune["at"] is None or time.monotonic() - _last_prune["at"] > PRUNE_INTERVAL:
+        _last_prune["at"] = time.monotonic()
+        prune_tombstones(db)
+
+    # Every seq <= head is committed: writers hold the counter row until they commit
+    counter = db.get(ChangeCounterORM, 1)
+    head = counter.seq
+    full_resync = since_seq is not None and since_seq < counter.pruned_seq
+
+    categories = db.query(CategoryORM)
+    qnas = db.query(QnaORM)
+    deleted = []
+    if since_seq is not None and not full_resync:
+        categories = categories.filter(CategoryORM.change_seq > since_seq, CategoryORM.change_seq <= head)
+        qnas = qnas.filter(QnaORM.change_seq > since_seq, QnaORM.change_seq <= head)
+        deleted = (
+            db.query(TombstoneORM)
+            .filter(TombstoneORM.change_seq > since_seq, TombstoneORM.change_seq <= head)
+            .order_by(TombstoneORM.change_seq)
+            .all()
+        )
+
+    return {
+        "categories": categories.order_by(CategoryORM.change_seq).all(),
+        "qnas": qnas.order_by(QnaORM.change_seq).all(),
+        "deleted": deleted,
+        "next_token": str(head),
+        "full_resync": full_resync,
+    }
@@ -1,5 +1,6 @@
-from typing import Optional
-from pydantic import BaseModel, Field, constr
+from datetime import datetime
+from typing import List, Optional
+from pydantic import BaseModel, Field, constr, conlist
 
 class CategoryCreate(BaseModel):
     name: constr(min_length=1, max_length=100, strip_whitespace=True)
@@ -7,6 +8,8 @@ class CategoryCreate(BaseModel):
 class CategoryRead(BaseModel):
     id: int
     name: str
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
     class Config:
         from_attributes = True   # ✅ Pydantic v2 replaces orm_mode
 
@@ -34,7 +37,40 @@ class QnaRead(BaseModel):
     is_done: Optional[bool] = False
     bookmark: Optional[bool] = False
     category_id: Optional[int] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
 
+class TombstoneRead(BaseModel):
+    entity: str
+    entity_id: int
+    deleted_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class SyncResponse(BaseModel):
+    categories: List[CategoryRead]
+    qnas: List[QnaRead]
+    deleted: List[TombstoneRead]
+    next_token: str
+    # True when `since` predates pruned tombstones: the lists are a full snapshot to replace local state with
+    full_resync: bool = False
+
+
+class ChangeFilter(BaseModel):
+    category_id: Optional[int] = None
+    bookmark: Optional[bool] = None
+
+class SearchBatchRequest(BaseModel):
+    queries: conlist(constr(min_length=1, strip_whitespace=True), min_length=1, max_length=100)
+    top_k: int = Field(5, ge=1, le=50)
+    category_id: Optional[int] = None
+    is_done: Optional[bool] = None
+    bookmark: Optional[bool] = None
+
+class SearchBatchResult(BaseModel):
+    query: str
+    results: List[QnaRead]
@@ -0,0 +1,246 @@
+import asyncio
+import logging
+import os
+import threading
+from typing import Optional
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from db import SessionLocal
+from models import QnaORM, CategoryORM, TombstoneORM, ChangeCounterORM
+from schemas import QnaRead, CategoryRead
+
+log = logging.getLogger(__name__)
+
+# Events are buffered for this long so bulk imports go out as a few batched messages
+BATCH_WINDOW = 0.05
+MAX_EVENTS_PER_MESSAGE = 500
+# Messages a subscriber may fall behind before its backlog is dropped and it's told to resync
+MAX_PENDING_MESSAGES = 100
+# Commits made by other workers are picked up by tailing change_seq this often
+TAIL_INTERVAL = float(os.getenv("CHANGE_FEED_TAIL_INTERVAL", 1.0))
+# A tail step that finds more rows than this tells subscribers to resync instead
+MAX_TAIL_ROWS = 5000
+
+ENTITIES = {QnaORM: ("qna", QnaRead), CategoryORM: ("category", CategoryRead)}
+
+# In-process callbacks run with each committed batch of events (e.g. the draw id pools)
+commit_hooks = []
+
+
+class Subscriber:
+    def __init__(self, category_id: Optional[int] = None, bookmark: Optional[bool] = None):
+        self.category_id = category_id
+        self.bookmark = bookmark
+        self.queue = asyncio.Queue(maxsize=MAX_PENDING_MESSAGES)
+
+    def _state_matches(self, state: dict) -> bool:
+        if self.category_id is not None and state.get("category_id") != self.category_id:
+            return False
+        if self.bookmark is not None and state.get("bookmark") != self.bookmark:
+            return False
+        return True
+
+    def matches(self, ev: dict) -> bool:
+        if ev["entity"] == "category":
+            return self.category_id is None or ev["id"] == self.category_id
+        # Tailed from another worker: the previous state is unknown, so it may be leaving the filter
+        if ev.get("remote"):
+            return True
+        # An update that moves a QnA out of the filter still has to reach the subscriber
+        return self._state_matches(ev["data"]) or ("was" in ev and self._state_matches({**ev["data"], **ev["was"]}))
+
+    def offer(self, batch: list):
+        events = [ev for ev in batch if self.matches(ev)]
+        for start in range(0, len(events), MAX_EVENTS_PER_MESSAGE):
+            message = {"type": "changes", "events": events[start:start + MAX_EVENTS_PER_MESSAGE]}
+            try:
+                self.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # Slow consumer: never block writers, just make the client fall back to /sync
+                self.resync()
+                return
+
+    def resync(self):
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait({"type": "resync"})
+
+
+class ChangeFeed:
+    """
+    Fan-out of committed changes to this worker's WebSocket subscribers.
+    publish() is safe to call from threadpool handlers and never blocks.
+    Commits from this process arrive through publish(); while anyone is
+    subscribed, one task per worker also tails change_seq for commits made by
+    other workers, skipping the ones already published here.
+    """
+
+    def __init__(self):
+        self.loop = None
+        self.subscribers = set()
+        self._buffer = []
+        self._flush_scheduled = False
+        self._tail_task = None
+        self._tail_seq = None
+        # change_seqs published by this process since the tail's last step
+        self._local_seqs = set()
+        self._local_lock = threading.Lock()
+
+    def subscribe(self, category_id: Optional[int] = None, bookmark: Optional[bool] = None) -> Subscriber:
+        self.loop = asyncio.get_running_loop()
+        sub = Subscriber(category_id=category_id, bookmark=bookmark)
+        self.subscribers.add(sub)
+        task = self._tail_task
+        if task is None or task.done() or task.get_loop() is not self.loop:
+            self._tail_seq = None
+            self._tail_task = self.loop.create_task(self._tail())
+        return sub
+
+    def unsubscribe(self, sub: Subscriber):
+        self.subscribers.discard(sub)
+
+    def publish(self, events: list):
+        if not events or not self.subscribers or self.loop is None or self.loop.is_closed():
+            return
+        with self._local_lock:
+            self._local_seqs.update(ev["seq"] for ev in events)
+        self.loop.call_soon_threadsafe(self._enqueue, events)
+
+    async def _tail(self):
+        # Starts from the current head: subscribers only get changes from now on
+        while self.subscribers:
+            try:
+                if self._tail_seq is None:
+                    self._tail_seq = await asyncio.to_thread(_head_seq)
+                    continue
+                await asyncio.sleep(TAIL_INTERVAL)
+                head, events = await asyncio.to_thread(_changes_after, self._tail_seq)
+            except Exception:
+                # Database unavailable: try again next interval from the same position
+                log.warning("Change feed tail failed", exc_info=True)
+                await asyncio.sleep(TAIL_INTERVAL)
+                continue
+            with self._local_lock:
+                local = self._local_seqs
+                self._local_seqs = {seq for seq in local if seq > head}
+            self._tail_seq = head
+            if events is None:
+                for sub in list(self.subscribers):
+                    sub.resync()
+                continue
+            remote = [ev for ev in events if ev["seq"] not in local]
+            if remote:
+                self._enqueue(remote)
+
+    def _enqueue(self, events: list):
+        self._buffer.extend(events)
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            self.loop.call_later(BATCH_WINDOW, self._flush)
+
+    def _flush(self):
+        batch, self._buffer = self._buffer, []
+        self._flush_scheduled = False
+        for sub in list(self.subscribers):
+            sub.offer(batch)
+
+
+feed = ChangeFeed()
+
+
+def _head_seq() -> int:
+    with SessionLocal() as db:
+        return db.get(ChangeCounterORM, 1).seq
+
+
+def _changes_after(since: int):
+    """
+    Return (head, events) for everything committed after `since`, the same
+    window /sync serves; events is None when there are more than MAX_TAIL_ROWS.
+    """
+    with SessionLocal() as db:
+        head = db.get(ChangeCounterORM, 1).seq
+        if head <= since:
+            return head, []
+        events = []
+        for orm, (name, schema) in ENTITIES.items():
+            rows = (
+                db.query(orm)
+                .filter(orm.change_seq > since, orm.change_seq <= head)
+                .limit(MAX_TAIL_ROWS + 1)
+                .all()
+            )
+            # Created and updated rows look the same here: clients upsert them
+            events.extend(
+                {"op": "updated", "entity": name, "id": row.id, "seq": row.change_seq, "remote": True,
+                 "data": schema.model_validate(row).model_dump(mode="json")}
+                for row in rows
+            )
+        tombstones = (
+            db.query(TombstoneORM)
+            .filter(TombstoneORM.change_seq > since, TombstoneORM.change_seq <= head)
+            .limit(MAX_TAIL_ROWS + 1)
+            .all()
+        )
+        events.extend(
+            {"op": "deleted", "entity": t.entity, "id": t.entity_id, "seq": t.change_seq, "remote": True, "data": {}}
+            for t in tombstones
+        )
+    if len(events) > MAX_TAIL_ROWS:
+        return head, None
+    return head, sorted(events, key=lambda ev: ev["seq"])
+
+
+def _event(op: str, obj) -> Optional[dict]:
+    entity = ENTITIES.get(type(obj))
+    if not entity:
+        return None
+    name, schema = entity
+    if op == "deleted":
+        # Deletes only carry what subscribers filter on
+        data = {"category_id": obj.category_id, "bookmark": obj.bookmark} if name == "qna" else {}
+    else:
+        data = schema.model_validate(obj).model_dump(mode="json")
+    ev = {"op": op, "entity": name, "id": obj.id, "data": data}
+    if op == "updated":
+        # Columns this update touched, so hooks (and clients) can skip irrelevant ones
+        state = inspect(obj)
+        ev["changed"] = [attr.key for attr in state.mapper.column_attrs if state.attrs[attr.key].history.has_changes()]
+    if op == "updated" and name == "qna":
+        was = {}
+        for field in ("category_id", "bookmark", "is_done"):
+            history = state.attrs[field].history
+            if history.deleted:
+                was[field] = history.deleted[0]
+        if was:
+            ev["was"] = was
+    return ev
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changes(session, flush_context):
+    pending = session.info.setdefault("change_events", [])
+    # Stamped on every row by before_flush; lets the tail skip commits already published here
+    seq = session.info.get("change_seq")
+    for op, objs in (("created", session.new), ("updated", session.dirty), ("deleted", session.deleted)):
+        for obj in objs:
+            if op == "updated" and not session.is_modified(obj):
+                continue
+            ev = _event(op, obj)
+            if ev:
+                ev["seq"] = seq
+                pending.append(ev)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_changes(session):
+    events = session.info.pop("change_events", [])
+    if events:
+        for hook in commit_hooks:
+            hook(events)
+    feed.publish(events)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_changes(session):
+    session.info.pop("change_events", None)
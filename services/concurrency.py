@@ -0,0 +1,116 @@
+import asyncio
+import os
+import threading
+import weakref
+from concurrent.futures import Future
+from contextlib import asynccontextmanager
+from fastapi import HTTPException
+
+
+class SingleFlight:
+    """
+    Coalesce identical in-flight calls: the first caller for a key runs `fn`,
+    concurrent callers with the same key wait for and share its result.
+    Handlers run in the threadpool, so this is thread-based.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+class AdmissionLimiter:
+    """
+    Cap concurrent requests to an expensive endpoint with a bounded wait queue.
+    Requests beyond the queue, or that wait too long, are shed with 503 + Retry-After
+    before they take a threadpool slot, so cheap routes keep getting served.
+    """
+
+    def __init__(self, name: str, max_concurrent: int, max_waiting: int, max_wait: float = 5.0, retry_after: int = 1):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_waiting = max_waiting
+        self.max_wait = max_wait
+        self.retry_after = retry_after
+        # Semaphores are bound to the loop they're first used on: keep one per loop
+        self._loops = weakref.WeakKeyDictionary()
+
+    def _shed(self):
+        raise HTTPException(
+            status_code=503,
+            detail=f"Too many concurrent {self.name} requests, retry shortly",
+            headers={"Retry-After": str(self.retry_after)},
+        )
+
+    def _state(self) -> dict:
+        loop = asyncio.get_running_loop()
+        state = self._loops.get(loop)
+        if state is None:
+            state = self._loops[loop] = {"semaphore": asyncio.Semaphore(self.max_concurrent), "waiting": 0}
+        return state
+
+    @asynccontextmanager
+    async def admit(self):
+        state = self._state()
+        semaphore = state["semaphore"]
+        if semaphore.locked() and state["waiting"] >= self.max_waiting:
+            self._shed()
+
+        state["waiting"] += 1
+        try:
+            # Not wait_for: on 3.11 it can drop a permit acquired right as the timeout fires.
+            # Semaphore.acquire() itself gives the permit back when cancelled after a wake-up.
+            async with asyncio.timeout(self.max_wait):
+                await semaphore.acquire()
+        except TimeoutError:
+            self._shed()
+        finally:
+            state["waiting"] -= 1
+
+        try:
+            yield
+        finally:
+            semaphore.release()
+
+    async def __call__(self):
+        async with self.admit():
+            yield
+
+
+def _limit(name: str, concurrent: int, waiting: int) -> AdmissionLimiter:
+    prefix = name.upper()
+    return AdmissionLimiter(
+        name,
+        max_concurrent=int(os.getenv(f"{prefix}_MAX_CONCURRENCY", concurrent)),
+        max_waiting=int(os.getenv(f"{prefix}_MAX_WAITING", waiting)),
+        max_wait=float(os.getenv(f"{prefix}_MAX_WAIT", 5.0)),
+    )
+
+
+# Kept well under the threadpool size (40) so CRUD routes always find a free thread
+search_limiter = _limit("search", concurrent=8, waiting=32)
+export_limiter = _limit("export", concurrent=2, waiting=8)
+summarize_limiter = _limit("summarize", concurrent=4, waiting=16)
+
+flights = SingleFlight()
@@ -0,0 +1,182 @@
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from sqlalchemy.orm import Session
+from db import SessionLocal, session_role
+from models import QnaORM
+from services.changes import commit_hooks
+from services.concurrency import flights
+
+# Id pools are rebuilt after this long so changes made by other workers show up.
+# The rebuild runs in the background; draws keep using the expired pool meanwhile.
+POOL_TTL = float(os.getenv("DRAW_POOL_TTL", 60))
+# Least recently used pools are dropped beyond this many ids in total (~110 bytes each)
+MAX_POOL_IDS = int(os.getenv("DRAW_POOL_MAX_IDS", 2_000_000))
+MAX_ATTEMPTS = 3
+
+FILTERS = ("category_id", "is_done")
+
+
+class IdPool:
+    """
+    Ids matching one filter, with O(1) add/remove (swap with last) and O(n) sampling.
+    """
+
+    def __init__(self, ids: list):
+        self.ids = list(ids)
+        self.positions = {qna_id: i for i, qna_id in enumerate(self.ids)}
+        self.loaded_at = time.monotonic()
+
+    def add(self, qna_id: int):
+        if qna_id not in self.positions:
+            self.positions[qna_id] = len(self.ids)
+            self.ids.append(qna_id)
+
+    def remove(self, qna_id: int):
+        i = self.positions.pop(qna_id, None)
+        if i is None:
+            return
+        last = self.ids.pop()
+        if i < len(self.ids):
+            self.ids[i] = last
+            self.positions[last] = i
+
+    def sample(self, n: int) -> list:
+        return random.sample(self.ids, min(n, len(self.ids)))
+
+
+_pools = OrderedDict()
+# Pools being scanned -> events committed meanwhile, replayed onto the pool once the scan is done
+_journals = {}
+# Keys with a background refresh in progress
+_refreshing = set()
+_lock = threading.Lock()
+
+
+def _keys_for(state: dict) -> list:
+    # Every cached filter a QnA in this state belongs to (None = not filtered on)
+    category_id, is_done = state.get("category_id"), state.get("is_done")
+    return [(c, d) for c in (None, category_id) for d in (None, is_done)]
+
+
+def _apply_event(pools: dict, ev: dict):
+    qna_id = ev["id"]
+    if ev["op"] == "deleted":
+        for pool in pools.values():
+            pool.remove(qna_id)
+        return
+    if "was" in ev:
+        for key in _keys_for({**ev["data"], **ev["was"]}):
+            if key in pools:
+                pools[key].remove(qna_id)
+    for key in _keys_for(ev["data"]):
+        if key in pools:
+            pools[key].add(qna_id)
+
+
+def _apply_changes(events: list):
+    """
+    Keep cached pools in step with committed QnA changes from this process.
+    """
+    with _lock:
+        if not _pools and not _journals:
+            return
+        for ev in events:
+            if ev["entity"] != "qna":
+                continue
+            _apply_event(_pools, ev)
+            for journal in _journals.values():
+                journal.append(ev)
+
+
+commit_hooks.append(_apply_changes)
+
+
+def _filtered(query, category_id, is_done):
+    if category_id is not None:
+        query = query.filter(QnaORM.category_id == category_id)
+    if is_done is not None:
+        query = query.filter(QnaORM.is_done == is_done)
+    return query
+
+
+def _load(db: Session, key: tuple) -> IdPool:
+    # Journal first: anything committed after this point is replayed, whether or not the scan saw it
+    with _lock:
+        _journals[key] = []
+    try:
+        # Index-only scan on ix_qnas_category_done; done outside the lock
+        ids = [row.id for row in _filtered(db.query(QnaORM.id), *key)]
+    except BaseException:
+        with _lock:
+            _journals.pop(key, None)
+        raise
+    pool = IdPool(ids)
+    with _lock:
+        for ev in _journals.pop(key):
+            _apply_event({key: pool}, ev)
+        _pools[key] = pool
+        _pools.move_to_end(key)
+        total = sum(len(p.ids) for p in _pools.values())
+        # Never evict the pool just loaded, even if it alone is over the limit
+        while total > MAX_POOL_IDS and len(_pools) > 1:
+            _, evicted = _pools.popitem(last=False)
+            total -= len(evicted.ids)
+    return pool
+
+
+def _refresh(key: tuple):
+    try:
+        # Own session: the request that noticed the expiry has moved on by now
+        with SessionLocal() as db:
+            flights.do(("draw_pool", key), lambda: _load(db, key))
+    finally:
+        with _lock:
+            _refreshing.discard(key)
+
+
+def _pool(db: Session, key: tuple) -> IdPool:
+    with _lock:
+        pool = _pools.get(key)
+        if pool:
+            _pools.move_to_end(key)
+            if time.monotonic() - pool.loaded_at >= POOL_TTL and key not in _refreshing:
+                _refreshing.add(key)
+                threading.Thread(target=_refresh, args=(key,), daemon=True).start()
+            return pool
+    # One scan per key at a time: concurrent first draws for a filter share it
+    return flights.do(("draw_pool", key), lambda: _load(db, key))
+
+
+def draw(db: Session, n: int, category_id: Optional[int] = None, is_done: Optional[bool] = None) -> list:
+    """
+    Draw up to `n` distinct QnAs uniformly at random from those matching the filters.
+    Sampling works on a cached id pool, so the cost depends on `n`, not on bank size;
+    only the first draw for a filter waits for its pool to be scanned.
+    """
+    key = (category_id, is_done)
+    pool = _pool(db, key)
+    drawn, skipped = [], set()
+    # Only the primary is authoritative: a lagging replica just hasn't replayed some rows yet
+    prune = session_role(db) == "primary"
+    for _ in range(MAX_ATTEMPTS):
+        with _lock:
+            seen = {q.id for q in drawn} | skipped
+            candidates = [i for i in pool.sample(n + len(seen)) if i not in seen][:n - len(drawn)]
+        if not candidates:
+            break
+        # Re-check the filters: another worker may have changed rows since the pool was loaded
+        rows = {q.id: q for q in _filtered(db.query(QnaORM).filter(QnaORM.id.in_(candidates)), *key)}
+        drawn.extend(rows[i] for i in candidates if i in rows)
+        stale = [i for i in candidates if i not in rows]
+        if not stale or len(drawn) >= n:
+            break
+        skipped.update(stale)
+        if prune:
+            with _lock:
+                for i in stale:
+                    pool.remove(i)
+    return drawn
@@ -1,75 +1,392 @@
+import os
+import fcntl
+import json
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
 import faiss
 import numpy as np
 from sentence_transformers import SentenceTransformer
 from sqlalchemy.orm import Session
 from models import QnaORM
+from services.changes import commit_hooks
+
+log = logging.getLogger(__name__)
 
 # Load embedding model
 model = SentenceTransformer("all-MiniLM-L6-v2")
 embedding_dim = model.get_sentence_embedding_dimension()
-id_map = {}
-# FAISS index + mapping
-index = faiss.IndexIDMap(faiss.IndexFlatL2(embedding_dim))
 
-def semantic_search(query: str, db: Session, top_k: int = 5):
+# Shared on-disk index. Every worker mmaps the current base generation read-only.
+# Single-QnA edits don't rewrite the base: they go into a small delta (new vectors
+# plus ids masked out of the base) published as its own generation, and the delta
+# is merged into a new base once it holds MAX_DELTA entries. Writers are
+# serialized across processes by a file lock; CURRENT is swapped atomically.
+INDEX_DIR = os.getenv("INDEX_DIR", "./faiss_index")
+CURRENT_FILE = os.path.join(INDEX_DIR, "CURRENT")
+LOCK_FILE = os.path.join(INDEX_DIR, "writer.lock")
+MAX_DELTA = int(os.getenv("INDEX_MAX_DELTA", 10_000))
+# Only edits to these re-embed a QnA; bookmark/done toggles keep its vector
+EMBEDDED_FIELDS = {"question", "answer"}
+
+READ_FLAGS = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY | getattr(faiss, "IO_FLAG_MMAP_IFC", 0)
+
+os.makedirs(INDEX_DIR, exist_ok=True)
+
+# LRU of query text -> embedding, so repeated queries skip the model
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", 1024))
+_query_cache = OrderedDict()
+_query_cache_lock = threading.Lock()
+
+# (generation, Snapshot) — replaced as a whole so queries never see a half-swap.
+# Keyed on the generation number, not CURRENT's inode: a freed inode can be reused
+# by the next publish, which would hide it from readers.
+_current = (None, None)
+_reload_lock = threading.Lock()
+
+
+def _empty_index():
+    return faiss.IndexIDMap(faiss.IndexFlatL2(embedding_dim))
+
+
+def _base_path(generation: int) -> str:
+    return os.path.join(INDEX_DIR, f"base-{generation:08d}.faiss")
+
+
+def _delta_path(generation: int) -> str:
+    return os.path.join(INDEX_DIR, f"delta-{generation:08d}.npz")
+
+
+class Snapshot:
     """
-    Run semantic search on FAISS index.
+    One published generation: mmapped base + in-memory delta. Base hits whose id
+    is in `removed` (deleted or re-embedded since the base was written) are dropped.
     """
-    if index.ntotal == 0:
-        build_index(db)
 
-    q_emb = model.encode([query], convert_to_numpy=True)
-    D, I = index.search(q_emb, top_k)
+    def __init__(self, base, delta, removed: np.ndarray):
+        self.base = base
+        self.delta = delta
+        self.removed = removed
 
-    ids = [id_map[i] for i in I[0] if i in id_map]
-    if not ids:
-        return []
+    @property
+    def ntotal(self) -> int:
+        return self.base.ntotal - len(self.removed) + self.delta.ntotal
+
+    def search(self, queries: np.ndarray, k: int):
+        # Fetch extra from the base so masked ids can't crowd out live ones
+        D, I = self.base.search(queries, k + len(self.removed))
+        if len(self.removed):
+            masked = np.isin(I, self.removed)
+            D, I = np.where(masked, np.inf, D), np.where(masked, -1, I)
+        if self.delta.ntotal:
+            dD, dI = self.delta.search(queries, k)
+            D, I = np.hstack([D, dD]), np.hstack([I, dI])
+        order = np.argsort(D, axis=1, kind="stable")[:, :k]
+        return np.take_along_axis(D, order, axis=1), np.take_along_axis(I, order, axis=1)
+
+
+def _read_current():
+    """
+    Return the published state {"generation": ..., "base": ...}, or None if nothing
+    is published yet.
+    """
+    try:
+        with open(CURRENT_FILE) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _load_delta(generation: int):
+    with np.load(_delta_path(generation)) as data:
+        return faiss.deserialize_index(data["delta"]), data["removed"]
+
+
+def _load_snapshot(state: dict) -> Snapshot:
+    delta, removed = _load_delta(state["generation"])
+    return Snapshot(faiss.read_index(_base_path(state["base"]), READ_FLAGS), delta, removed)
+
+
+def get_index():
+    """
+    Return the latest published Snapshot, swapping in a new generation if one appeared.
+    Queries keep using the old snapshot while another thread loads the new one, or
+    if the new one can't be loaded (e.g. its files were already cleaned up).
+    """
+    global _current
+    generation, snapshot = _current
+    # CURRENT is a few bytes; reading it per search is cheaper than missing a generation
+    state = _read_current()
+    if state is None or state["generation"] == generation:
+        return snapshot
+
+    if not _reload_lock.acquire(blocking=snapshot is None):
+        return snapshot
+    try:
+        # Files can vanish between reading CURRENT and opening them if a writer
+        # publishes twice in that window; re-read CURRENT and try again once.
+        for attempt in range(2):
+            if attempt:
+                state = _read_current()
+                if state is None:
+                    return snapshot
+            try:
+                new_snapshot = _load_snapshot(state)
+            except (RuntimeError, OSError, KeyError, ValueError):
+                continue
+            _current = (state["generation"], new_snapshot)
+            return new_snapshot
+        return snapshot
+    finally:
+        _reload_lock.release()
+
+
+@contextmanager
+def _writer_lock():
+    """
+    Exclusive cross-process lock so only one worker publishes at a time.
+    """
+    with open(LOCK_FILE, "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _write_atomic(path: str, write):
+    tmp = path + ".tmp"
+    write(tmp)
+    os.replace(tmp, path)
+
+
+def _publish(previous, generation: int, base: int, delta, removed: np.ndarray):
+    """
+    Write the delta for `generation`, point CURRENT at it and drop files that
+    neither this nor the previous generation uses. Must hold the writer lock.
+    """
+    def write_delta(tmp):
+        with open(tmp, "wb") as f:
+            np.savez(f, delta=faiss.serialize_index(delta), removed=removed)
+    _write_atomic(_delta_path(generation), write_delta)
+
+    def write_current(tmp):
+        with open(tmp, "w") as f:
+            json.dump({"generation": generation, "base": base}, f)
+            f.flush()
+            os.fsync(f.fileno())
+    _write_atomic(CURRENT_FILE, write_current)
+
+    # Readers that still mmap an older base keep their pages until they swap
+    keep = {os.path.basename(_delta_path(generation)), os.path.basename(_base_path(base))}
+    if previous:
+        keep |= {os.path.basename(_delta_path(previous["generation"])), os.path.basename(_base_path(previous["base"]))}
+    for name in os.listdir(INDEX_DIR):
+        if name.startswith(("base-", "delta-")) and name not in keep:
+            try:
+                os.remove(os.path.join(INDEX_DIR, name))
+            except FileNotFoundError:
+                pass
+
+
+def _publish_base(previous, index):
+    generation = previous["generation"] + 1 if previous else 1
+    _write_atomic(_base_path(generation), lambda tmp: faiss.write_index(index, tmp))
+    _publish(previous, generation, generation, _empty_index(), np.array([], dtype=np.int64))
+
+
+def _apply(upsert_ids=None, embeddings=None, remove_ids=None):
+    """
+    Publish one edit as a new delta generation; merge into a new base once the delta is large.
+    Before the first build nothing is published: the edit is skipped, it's already
+    committed, so the build ensure_index runs later picks it up from the DB.
+    """
+    with _writer_lock():
+        previous = _read_current()
+        if previous is None:
+            return
+        delta, removed = _load_delta(previous["generation"])
+
+        touched = np.concatenate([
+            np.asarray(ids, dtype=np.int64) for ids in (upsert_ids, remove_ids) if ids is not None
+        ])
+        delta.remove_ids(touched)
+        if remove_ids is not None:
+            removed = np.union1d(removed, np.asarray(remove_ids, dtype=np.int64))
+        if upsert_ids is not None:
+            delta.add_with_ids(embeddings, np.asarray(upsert_ids, dtype=np.int64))
+
+        if delta.ntotal + len(removed) <= MAX_DELTA:
+            _publish(previous, previous["generation"] + 1, previous["base"], delta, removed)
+            return
+
+        # Merge: fold the delta into a full copy of the base
+        base = faiss.read_index(_base_path(previous["base"]))
+        base.remove_ids(removed)
+        if delta.ntotal:
+            base.add_with_ids(delta.index.reconstruct_n(0, delta.ntotal), faiss.vector_to_array(delta.id_map))
+        _publish_base(previous, base)
+
+
+def _qna_text(question: str, answer) -> str:
+    return f"{question} {answer or ''}"
+
+
+def _embed_qnas(qnas: list) -> np.ndarray:
+    return model.encode([_qna_text(q.question, q.answer) for q in qnas], convert_to_numpy=True)
 
-    return db.query(QnaORM).filter(QnaORM.id.in_(ids)).all()
 
 def build_index(db: Session):
     """
-    Rebuild the whole FAISS index from DB.
+    Rebuild the whole FAISS index from DB and publish it as a new base.
     """
-    index.reset()
+    with _writer_lock():
+        _build_locked(db, _read_current())
+
+
+def _build_locked(db: Session, previous):
     qnas = db.query(QnaORM).all()
-    if not qnas:
+    index = _empty_index()
+    if qnas:
+        index.add_with_ids(_embed_qnas(qnas), np.array([q.id for q in qnas], dtype=np.int64))
+    _publish_base(previous, index)
+
+
+def ensure_index(db: Session):
+    """
+    Build the index once if nothing has been published yet. Workers starting
+    together wait on the writer lock and reuse the first one's build; an empty
+    bank publishes nothing until it has rows to build from.
+    """
+    if get_index() is not None:
         return
-    texts = [f"{q.question} {q.answer or ''}" for q in qnas]
-    embeddings = model.encode(texts, convert_to_numpy=True)
-    ids = np.array([q.id for q in qnas])
-    index.add_with_ids(embeddings, ids)
+    with _writer_lock():
+        previous = _read_current()
+        if previous is None and db.query(QnaORM.id).first() is not None:
+            _build_locked(db, previous)
+
 
 def add_to_index(qna: QnaORM):
     """
     Add a single QnA to FAISS.
     """
-    text = f"{qna.question} {qna.answer or ''}"
-    emb = model.encode([text], convert_to_numpy=True)
-    index.add_with_ids(emb, np.array([qna.id]))
+    _apply(upsert_ids=[qna.id], embeddings=_embed_qnas([qna]))
+
 
 def update_in_index(qna: QnaORM):
     """
-    Remove old entry & re-add updated one.
+    Mask the old vector & add the updated one in a single generation.
     """
-    remove_from_index(qna.id)
-    add_to_index(qna)
+    _apply(upsert_ids=[qna.id], embeddings=_embed_qnas([qna]), remove_ids=[qna.id])
+
 
 def remove_from_index(qna_id: int):
     """
     Delete from FAISS by ID.
     """
-    index.remove_ids(np.array([qna_id]))
+    _apply(remove_ids=[qna_id])
+
+
+def index_changes(events: list):
+    """
+    Commit hook: publish the QnAs created, re-worded or deleted by one commit as a
+    single delta generation. Runs for every write path (routers and bulk import),
+    and other workers pick the generation up on their next search.
+    """
+    upserts, removes = {}, set()
+    for ev in events:
+        if ev["entity"] != "qna":
+            continue
+        if ev["op"] == "deleted":
+            upserts.pop(ev["id"], None)
+            removes.add(ev["id"])
+        elif ev["op"] == "created" or EMBEDDED_FIELDS & set(ev.get("changed", ())):
+            upserts[ev["id"]] = _qna_text(ev["data"]["question"], ev["data"]["answer"])
+            if ev["op"] == "updated":
+                # Mask the vector already in the base
+                removes.add(ev["id"])
+    if not upserts and not removes:
+        return
+    try:
+        embeddings = model.encode(list(upserts.values()), convert_to_numpy=True) if upserts else None
+        _apply(upsert_ids=list(upserts) or None, embeddings=embeddings, remove_ids=sorted(removes) or None)
+    except Exception:
+        # The rows are already committed; a failed index update mustn't fail the request
+        log.exception("Failed to index %d QnA changes", len(upserts) + len(removes))
+
+
+commit_hooks.append(index_changes)
+
+
+def encode_queries(queries: list) -> np.ndarray:
+    """
+    Embed queries, encoding all cache misses in one model call.
+    """
+    found = {}
+    with _query_cache_lock:
+        for q in queries:
+            if q in _query_cache:
+                _query_cache.move_to_end(q)
+                found[q] = _query_cache[q]
+
+    missing = [q for q in dict.fromkeys(queries) if q not in found]
+    if missing:
+        embeddings = model.encode(missing, convert_to_numpy=True)
+        with _query_cache_lock:
+            for q, emb in zip(missing, embeddings):
+                found[q] = _query_cache[q] = emb
+                _query_cache.move_to_end(q)
+            while len(_query_cache) > QUERY_CACHE_SIZE:
+                _query_cache.popitem(last=False)
+
+    return np.vstack([found[q] for q in queries]).astype(np.float32)
+
+
+def _searchable_index(db: Session):
+    ensure_index(db)
+    return get_index()
+
 
 def semantic_search(query: str, db: Session, top_k: int = 5):
     """
-    Search FAISS index.
+    Search the shared FAISS index.
     """
-    if index.ntotal == 0:
-        build_index(db)
-    q_emb = model.encode([query], convert_to_numpy=True)
-    D, I = index.search(q_emb, top_k)
+    index = _searchable_index(db)
+    if index is None:
+        return []
+    D, I = index.search(encode_queries([query]), top_k)
     ids = [int(i) for i in I[0] if i != -1]
     if not ids:
         return []
-    return db.query(QnaORM).filter(QnaORM.id.in_(ids)).all()
+    rows = {q.id: q for q in db.query(QnaORM).filter(QnaORM.id.in_(ids))}
+    return [rows[i] for i in ids if i in rows]
+
+
+def semantic_search_batch(queries: list, db: Session, top_k: int = 5,
+                          category_id=None, is_done=None, bookmark=None):
+    """
+    Search many queries at once: one model call, one FAISS call and one DB query.
+    Returns a list of hits per query, best match first.
+    """
+    index = _searchable_index(db)
+    if index is None:
+        return [[] for _ in queries]
+    filtered = any(f is not None for f in (category_id, is_done, bookmark))
+    # Over-fetch when filtering so each query still has top_k hits after the DB filter
+    D, I = index.search(encode_queries(queries), top_k * 4 if filtered else top_k)
+
+    all_ids = {int(i) for row in I for i in row if i != -1}
+    if not all_ids:
+        return [[] for _ in queries]
+
+    query = db.query(QnaORM).filter(QnaORM.id.in_(all_ids))
+    if category_id is not None:
+        query = query.filter(QnaORM.category_id == category_id)
+    if is_done is not None:
+        query = query.filter(QnaORM.is_done == is_done)
+    if bookmark is not None:
+        query = query.filter(QnaORM.bookmark == bookmark)
+    rows = {q.id: q for q in query.all()}
+
+    return [[rows[int(i)] for i in row if int(i) in rows][:top_k] for row in I]
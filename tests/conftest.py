@@ -0,0 +1,83 @@
+import importlib
+import pytest
+from fastapi.testclient import TestClient
+
+@pytest.fixture(scope="session")
+def main_app(tmp_path_factory):
+    """
+    main.app on a fresh SQLite file per test session.
+    db.py reads DATABASE_URL at import time, so tests must not import db/models/main
+    (or anything importing them) at module level — go through this fixture instead.
+    """
+    url = f"sqlite:///{tmp_path_factory.mktemp('db') / 'main.sqlite'}"
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("DATABASE_URL", url)
+        db = importlib.import_module("db")
+        if db.DATABASE_URL != url:
+            raise RuntimeError("db was imported before the main_app fixture; import it inside tests")
+        app = importlib.import_module("main").app
+        db.init_db()
+        yield app
+
+@pytest.fixture
+def client(main_app):
+    with TestClient(main_app) as c:
+        yield c
+
+@pytest.fixture
+def isolated_session(main_app, tmp_path):
+    """
+    Session on its own empty database, for tests that need to control every row.
+    """
+    from sqlalchemy.orm import sessionmaker
+    import db
+    engine = db._create_engine(f"sqlite:///{tmp_path / 'isolated.sqlite'}")
+    db.Base.metadata.create_all(bind=engine)
+    db._init_change_counter(engine)
+    with sessionmaker(autocommit=False, autoflush=False, bind=engine)() as s:
+        yield s
+    engine.dispose()
+
+class StubModel:
+    """
+    Stand-in for SentenceTransformer: hashed bag-of-words vectors, so texts
+    sharing words land close together. Counts encode() calls for cache tests.
+    """
+    dim = 16
+
+    def __init__(self, *args, **kwargs):
+        self.calls = []
+
+    def get_sentence_embedding_dimension(self):
+        return self.dim
+
+    def encode(self, texts, convert_to_numpy=True):
+        import zlib
+        import numpy as np
+        self.calls.append(list(texts))
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                vectors[row, zlib.crc32(word.strip("?.,").encode()) % self.dim] += 1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+@pytest.fixture
+def embeddings(main_app, monkeypatch, tmp_path):
+    """
+    A fresh services.embeddings on a tmp INDEX_DIR with StubModel instead of
+    sentence-transformers. Needs faiss; skipped when it isn't installed.
+    """
+    import sys
+    import types
+    pytest.importorskip("faiss")
+    stub = types.ModuleType("sentence_transformers")
+    stub.SentenceTransformer = StubModel
+    monkeypatch.setitem(sys.modules, "sentence_transformers", stub)
+    monkeypatch.setenv("INDEX_DIR", str(tmp_path / "index"))
+    monkeypatch.delitem(sys.modules, "services.embeddings", raising=False)
+    from services.changes import commit_hooks
+    hooks = list(commit_hooks)
+    yield importlib.import_module("services.embeddings")
+    # Drop this module's index hook so later commits don't write to a stale INDEX_DIR
+    commit_hooks[:] = hooks
@@ -0,0 +1,88 @@
+def test_change_feed_pushes_filtered_batches(client):
+    cat = client.post("/categories/", json={"name": "Feed Basics"}).json()
+    other = client.post("/categories/", json={"name": "Feed Other"}).json()
+
+    with client.websocket_connect(f"/ws/changes?category_id={cat['id']}") as ws:
+        q = client.post("/qnas/", json={"question": "What is a change feed?", "category_id": cat["id"]}).json()
+        client.post("/qnas/", json={"question": "Not for this subscriber", "category_id": other["id"]})
+        client.patch(f"/qnas/{q['id']}/bookmark")
+        client.delete(f"/qnas/{q['id']}")
+
+        seen = []
+        while len(seen) < 3:
+            message = ws.receive_json()
+            assert message["type"] == "changes"
+            seen.extend(message["events"])
+
+    assert [(ev["op"], ev["id"]) for ev in seen] == [("created", q["id"]), ("updated", q["id"]), ("deleted", q["id"])]
+    assert all(ev["data"]["category_id"] == cat["id"] for ev in seen)
+    assert seen[1]["data"]["bookmark"] is True
+
+def test_change_feed_rejects_bad_filter_messages_without_disconnecting(client):
+    cat = client.post("/categories/", json={"name": "Feed Filters"}).json()
+
+    with client.websocket_connect("/ws/changes") as ws:
+        for bad in ("not json", "[1, 2]", '{"category_id": "abc"}'):
+            ws.send_text(bad)
+            assert ws.receive_json()["type"] == "error"
+
+        ws.send_json({"category_id": str(cat["id"])})
+        # Messages are handled in order, so this reply means the filter is in place
+        ws.send_text("sync")
+        assert ws.receive_json()["type"] == "error"
+        client.post("/qnas/", json={"question": "Filtered out of this feed?"})
+        q = client.post("/qnas/", json={"question": "Kept by the string filter?", "category_id": cat["id"]}).json()
+
+        message = ws.receive_json()
+    assert [ev["id"] for ev in message["events"]] == [q["id"]]
+
+def wait_for_tail(feed):
+    import time
+    deadline = time.monotonic() + 5
+    while feed._tail_seq is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+def receive_events(ws, count):
+    events = []
+    while len(events) < count:
+        message = ws.receive_json()
+        assert message["type"] == "changes"
+        events.extend(message["events"])
+    return events
+
+def test_change_feed_tails_commits_from_other_workers(client, monkeypatch):
+    from services import changes
+    monkeypatch.setattr(changes, "TAIL_INTERVAL", 0.05)
+    cat = client.post("/categories/", json={"name": "Feed Tail"}).json()
+
+    with client.websocket_connect(f"/ws/changes?category_id={cat['id']}") as ws:
+        # The error reply means this connection has subscribed (and started the tail)
+        ws.send_text("sync")
+        assert ws.receive_json()["type"] == "error"
+        wait_for_tail(changes.feed)
+        local = client.post("/qnas/", json={"question": "Written here?", "category_id": cat["id"]}).json()
+        # Another worker's commit: it never reaches this process's publish()
+        with monkeypatch.context() as m:
+            m.setattr(changes.feed, "publish", lambda events: None)
+            remote = client.post("/qnas/", json={"question": "Written elsewhere?", "category_id": cat["id"]}).json()
+        events = receive_events(ws, 2)
+
+    assert [ev["id"] for ev in events] == [local["id"], remote["id"]]
+    assert "remote" not in events[0]
+    assert events[1]["remote"] is True and events[1]["data"]["question"] == "Written elsewhere?"
+    assert events[1]["seq"] > events[0]["seq"]
+
+def test_change_feed_asks_for_resync_when_tail_overflows(client, monkeypatch):
+    from services import changes
+    monkeypatch.setattr(changes, "TAIL_INTERVAL", 0.05)
+    monkeypatch.setattr(changes, "MAX_TAIL_ROWS", 0)
+
+    with client.websocket_connect("/ws/changes") as ws:
+        # The error reply means this connection has subscribed (and started the tail)
+        ws.send_text("sync")
+        assert ws.receive_json()["type"] == "error"
+        wait_for_tail(changes.feed)
+        with monkeypatch.context() as m:
+            m.setattr(changes.feed, "publish", lambda events: None)
+            client.post("/qnas/", json={"question": "Part of a big import elsewhere?"})
+        assert ws.receive_json() == {"type": "resync"}
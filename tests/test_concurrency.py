@@ -0,0 +1,81 @@
+import asyncio
+import threading
+import time
+import pytest
+from fastapi import HTTPException
+from services.concurrency import SingleFlight, AdmissionLimiter
+
+def test_single_flight_shares_one_computation():
+    flights = SingleFlight()
+    calls = []
+    results = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.1)
+        return "result"
+
+    threads = [threading.Thread(target=lambda: results.append(flights.do("key", compute))) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert results == ["result"] * 5
+
+@pytest.mark.asyncio
+async def test_admission_limiter_sheds_when_queue_full():
+    limiter = AdmissionLimiter("test", max_concurrent=1, max_waiting=1, max_wait=1.0)
+    release = asyncio.Event()
+
+    async def hold():
+        async with limiter.admit():
+            await release.wait()
+
+    holder = asyncio.create_task(hold())
+    waiter = asyncio.create_task(hold())
+    await asyncio.sleep(0.01)
+
+    with pytest.raises(HTTPException) as exc:
+        async with limiter.admit():
+            pass
+    assert exc.value.status_code == 503
+    assert exc.value.headers["Retry-After"] == "1"
+
+    release.set()
+    await asyncio.gather(holder, waiter)
+
+def test_admission_limiter_times_out_without_leaking_permits():
+    limiter = AdmissionLimiter("test", max_concurrent=1, max_waiting=10, max_wait=0.01)
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def hold():
+            async with limiter.admit():
+                await release.wait()
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        # Waiters time out while the permit is handed back at about the same moment
+        waiters = [asyncio.create_task(hold()) for _ in range(20)]
+        await asyncio.sleep(0.01)
+        release.set()
+        await asyncio.gather(holder, *waiters, return_exceptions=True)
+
+        async with limiter.admit():
+            pass
+        return limiter._state()["semaphore"]._value
+
+    assert asyncio.run(scenario()) == 1
+
+def test_admission_limiter_works_across_event_loops():
+    limiter = AdmissionLimiter("test", max_concurrent=1, max_waiting=1)
+
+    async def use():
+        async with limiter.admit():
+            pass
+
+    asyncio.run(use())
+    asyncio.run(use())
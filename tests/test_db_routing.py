@@ -0,0 +1,72 @@
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+@pytest.fixture
+def db(main_app):
+    import db
+    return db
+
+@pytest.fixture
+def replica(db, monkeypatch, tmp_path):
+    from models import CategoryORM
+    read_engine = db._create_engine(f"sqlite:///{tmp_path / 'replica.sqlite'}")
+    db.Base.metadata.create_all(bind=read_engine)
+    db._init_change_counter(read_engine)
+    monkeypatch.setattr(db, "read_engine", read_engine)
+    monkeypatch.setattr(db, "ReadSessionLocal", sessionmaker(autocommit=False, autoflush=False, bind=read_engine))
+    monkeypatch.setattr(db, "_replica_state", {"healthy": False, "checked_at": None})
+    with db.ReadSessionLocal() as s:
+        s.add(CategoryORM(name="Replica Only"))
+        s.commit()
+    yield read_engine
+    read_engine.dispose()
+
+def category_names(client):
+    return {c["name"] for c in client.get("/categories/").json()}
+
+def test_reads_go_to_replica_until_client_writes(replica, client):
+    assert "Replica Only" in category_names(client)
+
+    client.post("/categories/", json={"name": "Written To Primary"})
+    names = category_names(client)
+    assert "Written To Primary" in names
+    assert "Replica Only" not in names
+
+def test_reads_fall_back_to_primary_when_replica_down(db, replica, client, monkeypatch, tmp_path):
+    down = db._create_engine(f"sqlite:///{tmp_path / 'missing' / 'replica.sqlite'}")
+    monkeypatch.setattr(db, "read_engine", down)
+    assert "Replica Only" not in category_names(client)
+
+def test_cross_site_https_write_sets_none_samesite_cookie(replica, main_app):
+    from fastapi.testclient import TestClient
+    with TestClient(main_app, base_url="https://testserver") as client:
+        res = client.post("/categories/", json={"name": "Cross Site"},
+                          headers={"Origin": "https://interview-prep-frontend-kappa.vercel.app"})
+    cookie = res.headers["set-cookie"].lower()
+    assert "samesite=none" in cookie and "secure" in cookie
+    assert res.headers["X-Last-Write"]
+
+def test_same_site_http_write_keeps_lax_cookie(replica, client):
+    res = client.post("/categories/", json={"name": "Same Site"})
+    cookie = res.headers["set-cookie"].lower()
+    assert "samesite=lax" in cookie and "secure" not in cookie
+
+def test_echoed_header_keeps_reads_on_primary(replica, client):
+    stamp = client.post("/categories/", json={"name": "Echoed Header"}).headers["X-Last-Write"]
+    client.cookies.clear()
+    assert "Replica Only" in category_names(client)
+
+    names = {c["name"] for c in client.get("/categories/", headers={"X-Last-Write": stamp}).json()}
+    assert "Echoed Header" in names
+    assert "Replica Only" not in names
+
+def test_search_flights_are_keyed_by_database(replica, client, monkeypatch):
+    import routers.qnas
+    keys = []
+    real_do = routers.qnas.flights.do
+    monkeypatch.setattr(routers.qnas.flights, "do", lambda key, fn: keys.append(key) or real_do(key, fn))
+
+    client.get("/qnas/", params={"search": "flight"})
+    client.post("/categories/", json={"name": "Sticky Searcher"})
+    client.get("/qnas/", params={"search": "flight"})
+    assert keys == [("search", "flight", "replica"), ("search", "flight", "primary")]
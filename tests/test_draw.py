@@ -0,0 +1,142 @@
+def test_draw_samples_distinct_matching_qnas(client):
+    cat = client.post("/categories/", json={"name": "Draw Basics"}).json()
+    ids = [
+        client.post("/qnas/", json={"question": f"Draw question {i}?", "category_id": cat["id"]}).json()["id"]
+        for i in range(6)
+    ]
+    client.patch(f"/qnas/{ids[0]}/mark", params={"done": True})
+
+    res = client.get("/qnas/draw", params={"category_id": cat["id"], "is_done": False, "n": 10})
+    assert res.status_code == 200
+    drawn = [q["id"] for q in res.json()]
+    assert sorted(drawn) == sorted(ids[1:])
+
+    # Pool is cached now; changes must still be reflected
+    client.delete(f"/qnas/{ids[1]}")
+    new = client.post("/qnas/", json={"question": "Draw question new?", "category_id": cat["id"]}).json()
+    drawn = [q["id"] for q in client.get("/qnas/draw", params={"category_id": cat["id"], "is_done": False, "n": 10}).json()]
+    assert sorted(drawn) == sorted(ids[2:] + [new["id"]])
+
+    two = client.get("/qnas/draw", params={"category_id": cat["id"], "n": 2}).json()
+    assert len(two) == 2 and len({q["id"] for q in two}) == 2
+
+def _seed(session, name, n):
+    from models import CategoryORM, QnaORM
+    cat = CategoryORM(name=name)
+    session.add(cat)
+    session.flush()
+    qnas = [QnaORM(question=f"{name} {i}?", category_id=cat.id) for i in range(n)]
+    session.add_all(qnas)
+    session.commit()
+    return cat, qnas
+
+def test_changes_committed_during_pool_scan_are_kept(isolated_session, monkeypatch):
+    from collections import OrderedDict
+    from models import QnaORM
+    from services import draw
+    monkeypatch.setattr(draw, "_pools", OrderedDict())
+    cat, qnas = _seed(isolated_session, "Scan Race", 3)
+
+    real_filtered = draw._filtered
+    def scan_then_commit(query, *key):
+        rows = real_filtered(query, *key).all()
+        # Another request commits after the scan read its rows but before the pool is registered
+        isolated_session.delete(qnas[0])
+        isolated_session.add(QnaORM(question="Scan Race new?", category_id=cat.id))
+        isolated_session.commit()
+        return rows
+    monkeypatch.setattr(draw, "_filtered", scan_then_commit)
+
+    pool = draw._pool(isolated_session, (cat.id, None))
+    new_id = isolated_session.query(QnaORM.id).filter(QnaORM.question == "Scan Race new?").scalar()
+    assert sorted(pool.ids) == sorted([qnas[1].id, qnas[2].id, new_id])
+    assert not draw._journals
+
+def test_concurrent_pool_misses_share_one_scan(isolated_session, monkeypatch):
+    import threading
+    import time
+    from collections import OrderedDict
+    from services import draw
+    monkeypatch.setattr(draw, "_pools", OrderedDict())
+    cat, qnas = _seed(isolated_session, "Stampede", 4)
+
+    scans = []
+    real_filtered = draw._filtered
+    def slow_scan(query, *key):
+        scans.append(key)
+        time.sleep(0.2)
+        return real_filtered(query, *key)
+    monkeypatch.setattr(draw, "_filtered", slow_scan)
+
+    pools = []
+    threads = [threading.Thread(target=lambda: pools.append(draw._pool(isolated_session, (cat.id, None))))
+               for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert scans == [(cat.id, None)]
+    assert len(pools) == 8 and all(p is pools[0] for p in pools)
+    assert sorted(pools[0].ids) == sorted(q.id for q in qnas)
+
+def test_only_primary_reads_prune_the_shared_pool(isolated_session, monkeypatch):
+    from collections import OrderedDict
+    from sqlalchemy import delete
+    from models import QnaORM
+    from services import draw
+    monkeypatch.setattr(draw, "_pools", OrderedDict())
+    cat, qnas = _seed(isolated_session, "Lagging Replica", 3)
+    ids = sorted(q.id for q in qnas)
+    pool = draw._pool(isolated_session, (cat.id, None))
+
+    # Core delete: no commit events, like a row this session's database hasn't replayed yet
+    isolated_session.execute(delete(QnaORM).where(QnaORM.id == ids[2]))
+    isolated_session.commit()
+
+    monkeypatch.setattr(draw, "session_role", lambda db: "replica")
+    drawn = draw.draw(isolated_session, 3, category_id=cat.id)
+    assert sorted(q.id for q in drawn) == ids[:2]
+    assert sorted(pool.ids) == ids
+
+    monkeypatch.setattr(draw, "session_role", lambda db: "primary")
+    draw.draw(isolated_session, 3, category_id=cat.id)
+    assert sorted(pool.ids) == ids[:2]
+
+def test_expired_pool_is_served_while_it_refreshes(isolated_session, monkeypatch):
+    import time
+    from collections import OrderedDict
+    from sqlalchemy import insert
+    from sqlalchemy.orm import sessionmaker
+    from models import QnaORM
+    from services import draw
+    monkeypatch.setattr(draw, "_pools", OrderedDict())
+    monkeypatch.setattr(draw, "SessionLocal", sessionmaker(bind=isolated_session.get_bind()))
+    cat, qnas = _seed(isolated_session, "Refresh", 2)
+    key = (cat.id, None)
+    old = draw._pool(isolated_session, key)
+
+    # Written by "another worker": no commit events reach this process
+    new_id = isolated_session.execute(
+        insert(QnaORM).values(question="Refresh new?", category_id=cat.id, is_done=False, bookmark=False)
+    ).inserted_primary_key[0]
+    isolated_session.commit()
+
+    monkeypatch.setattr(draw, "POOL_TTL", 0)
+    assert draw._pool(isolated_session, key) is old
+    deadline = time.monotonic() + 5
+    while key in draw._refreshing and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert draw._pools[key] is not old
+    assert sorted(draw._pools[key].ids) == sorted([q.id for q in qnas] + [new_id])
+
+def test_pools_are_bounded_by_total_ids(isolated_session, monkeypatch):
+    from collections import OrderedDict
+    from services import draw
+    monkeypatch.setattr(draw, "_pools", OrderedDict())
+    monkeypatch.setattr(draw, "MAX_POOL_IDS", 5)
+    first, _ = _seed(isolated_session, "Bounded A", 3)
+    second, _ = _seed(isolated_session, "Bounded B", 3)
+
+    draw._pool(isolated_session, (first.id, None))
+    draw._pool(isolated_session, (second.id, None))
+    assert list(draw._pools) == [(second.id, None)]
@@ -0,0 +1,98 @@
+import os
+import pytest
+
+@pytest.fixture
+def session(main_app):
+    from db import SessionLocal
+    with SessionLocal() as s:
+        yield s
+
+def add_qna(session, question):
+    from models import QnaORM
+    q = QnaORM(question=question)
+    session.add(q)
+    session.commit()
+    return q
+
+def top_id(embeddings, text):
+    D, I = embeddings.get_index().search(embeddings.encode_queries([text]), 1)
+    return int(I[0][0])
+
+def base_files(embeddings):
+    return sorted(n for n in os.listdir(embeddings.INDEX_DIR) if n.startswith("base-"))
+
+def test_ensure_index_builds_once(embeddings, session):
+    add_qna(session, "Embedding build once question")
+    embeddings.ensure_index(session)
+    state = embeddings._read_current()
+    embeddings.ensure_index(session)
+    embeddings._current = (None, None)   # another worker with nothing loaded yet
+    embeddings.ensure_index(session)
+    assert embeddings._read_current() == state
+
+def test_empty_bank_publishes_nothing(embeddings, isolated_session):
+    assert embeddings.semantic_search("anything at all", isolated_session) == []
+    assert embeddings._read_current() is None
+    assert embeddings.semantic_search("anything at all", isolated_session) == []
+
+def test_edits_go_to_delta_and_merge_later(embeddings, session, monkeypatch):
+    q = add_qna(session, "Zebra stripes pattern question")
+    embeddings.ensure_index(session)
+    bases = base_files(embeddings)
+
+    other = add_qna(session, "Giraffe neck length question")
+    embeddings.add_to_index(other)
+    assert top_id(embeddings, "giraffe neck length") == other.id
+
+    q.question = "Penguin colony question"
+    session.commit()
+    embeddings.update_in_index(q)
+    assert top_id(embeddings, "penguin colony") == q.id
+    D, I = embeddings.get_index().search(embeddings.encode_queries(["zebra stripes pattern"]), 50)
+    assert list(I[0]).count(q.id) == 1
+
+    embeddings.remove_from_index(other.id)
+    D, I = embeddings.get_index().search(embeddings.encode_queries(["giraffe neck length"]), 50)
+    assert other.id not in I[0]
+    # Single edits never rewrote the base
+    assert base_files(embeddings) == bases
+
+    monkeypatch.setattr(embeddings, "MAX_DELTA", 0)
+    embeddings.remove_from_index(q.id)
+    assert base_files(embeddings) != bases
+    D, I = embeddings.get_index().search(embeddings.encode_queries(["penguin colony"]), 50)
+    assert q.id not in I[0] and other.id not in I[0]
+
+def test_reader_keeps_old_snapshot_when_generation_vanishes(embeddings, session):
+    add_qna(session, "Vanishing generation question")
+    embeddings.ensure_index(session)
+    snapshot = embeddings.get_index()
+    state = embeddings._read_current()
+
+    # CURRENT moved on, but its files are gone before this reader opens them
+    with open(embeddings.CURRENT_FILE + ".tmp", "w") as f:
+        f.write('{"generation": %d, "base": %d}' % (state["generation"] + 5, state["base"] + 5))
+    os.replace(embeddings.CURRENT_FILE + ".tmp", embeddings.CURRENT_FILE)
+    assert embeddings.get_index() is snapshot
+
+def test_first_edit_on_unindexed_bank_still_builds_from_db(embeddings, isolated_session):
+    existing = add_qna(isolated_session, "Walrus tusk question")
+    edited = add_qna(isolated_session, "Narwhal horn question")
+    # Rows exist but no index was ever published: the edit must not become the whole index
+    embeddings.add_to_index(edited)
+    assert embeddings._read_current() is None
+
+    embeddings.ensure_index(isolated_session)
+    assert embeddings.get_index().ntotal == 2
+    assert top_id(embeddings, "walrus tusk") == existing.id
+    assert top_id(embeddings, "narwhal horn") == edited.id
+
+def test_reader_sees_every_generation_published_back_to_back(embeddings, isolated_session):
+    qnas = [add_qna(isolated_session, f"Back to back question {i}") for i in range(6)]
+    embeddings.ensure_index(isolated_session)
+    assert embeddings.get_index().ntotal == 6
+    # Two publishes between reads: the second CURRENT can land on the first one's freed inode
+    for n in (2, 4, 6):
+        embeddings.remove_from_index(qnas[n - 2].id)
+        embeddings.remove_from_index(qnas[n - 1].id)
+        assert embeddings.get_index().ntotal == 6 - n
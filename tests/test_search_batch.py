@@ -0,0 +1,115 @@
+import io
+import json
+import sys
+import numpy as np
+import pytest
+
+@pytest.fixture
+def bank(isolated_session):
+    from models import CategoryORM, QnaORM
+
+    def add(question, category=None):
+        q = QnaORM(question=question, category_id=category.id if category else None)
+        isolated_session.add(q)
+        isolated_session.commit()
+        return q
+
+    def category(name):
+        c = CategoryORM(name=name)
+        isolated_session.add(c)
+        isolated_session.commit()
+        return c
+
+    add.category = category
+    return add
+
+@pytest.fixture
+def batch_client(client, main_app, isolated_session):
+    from db import get_read_db
+    main_app.dependency_overrides[get_read_db] = lambda: isolated_session
+    yield client
+    main_app.dependency_overrides.pop(get_read_db)
+
+def test_batch_search_without_semantic_dependencies_is_501(client, monkeypatch):
+    monkeypatch.setitem(sys.modules, "services.embeddings", None)
+    res = client.post("/qnas/search/batch", json={"queries": ["what is an index"]})
+    assert res.status_code == 501
+
+def test_encode_queries_caches_and_dedupes(embeddings, monkeypatch):
+    monkeypatch.setattr(embeddings, "QUERY_CACHE_SIZE", 2)
+    calls = embeddings.model.calls
+    calls.clear()
+
+    vectors = embeddings.encode_queries(["alpha", "alpha", "beta"])
+    assert calls == [["alpha", "beta"]]
+    assert np.array_equal(vectors[0], vectors[1])
+
+    embeddings.encode_queries(["beta", "alpha"])
+    assert len(calls) == 1
+
+    # "gamma" evicts the least recently used entry ("beta")
+    embeddings.encode_queries(["gamma"])
+    embeddings.encode_queries(["alpha"])
+    assert len(calls) == 2
+    embeddings.encode_queries(["beta"])
+    assert calls[-1] == ["beta"]
+
+def test_batch_search_returns_hits_per_query_in_rank_order(embeddings, bank, batch_client):
+    texts = ["rocket launch orbit", "rocket launch", "rocket", "violin concerto", "violin"]
+    ids = {text: bank(text).id for text in texts}
+    queries = ["rocket launch orbit", "violin concerto"]
+
+    res = batch_client.post("/qnas/search/batch", json={"queries": queries, "top_k": 3})
+    assert res.status_code == 200
+    data = res.json()
+    assert [r["query"] for r in data] == queries
+
+    model = embeddings.model
+    for query, result in zip(queries, data):
+        q = model.encode([query])[0]
+        expected = sorted(texts, key=lambda t: float(np.linalg.norm(model.encode([f"{t} "])[0] - q)))[:3]
+        assert [r["id"] for r in result["results"]] == [ids[t] for t in expected]
+
+def test_batch_search_over_fetches_when_filtering(embeddings, bank, batch_client):
+    wanted = bank.category("Wanted")
+    other = bank.category("Other")
+    for i in range(6):
+        bank("harbor lighthouse", other)
+    near = [bank("harbor lighthouse keeper", wanted).id, bank("harbor lighthouse keeper cottage", wanted).id]
+
+    unfiltered = batch_client.post("/qnas/search/batch", json={"queries": ["harbor lighthouse"], "top_k": 2}).json()
+    assert not set(near) & {r["id"] for r in unfiltered[0]["results"]}
+
+    res = batch_client.post(
+        "/qnas/search/batch",
+        json={"queries": ["harbor lighthouse"], "top_k": 2, "category_id": wanted.id},
+    ).json()
+    assert [r["id"] for r in res[0]["results"]] == near
+
+def top_hit(client, query):
+    res = client.post("/qnas/search/batch", json={"queries": [query], "top_k": 1})
+    assert res.status_code == 200
+    return res.json()[0]["results"][0]["id"]
+
+def test_writes_through_the_api_reach_batch_search(embeddings, client):
+    first = client.post("/qnas/", json={"question": "quasar telescope"}).json()
+    assert top_hit(client, "quasar telescope") == first["id"]
+
+    # Published by the commit hook as a delta on top of the first build
+    second = client.post("/qnas/", json={"question": "nebula galaxy"}).json()
+    assert top_hit(client, "nebula galaxy") == second["id"]
+
+    client.put(f"/qnas/{first['id']}", json={"question": "crater eclipse"})
+    assert top_hit(client, "crater eclipse") == first["id"]
+
+    rows = json.dumps([{"question": "comet orbit solar"}]).encode()
+    client.post("/bulk/import/json", files={"file": ("bank.json", io.BytesIO(rows), "application/json")})
+    imported = client.get("/qnas/", params={"search": "comet orbit solar"}).json()[0]
+    assert top_hit(client, "comet orbit solar") == imported["id"]
+
+def test_bookmark_toggle_does_not_publish_a_generation(embeddings, client):
+    q = client.post("/qnas/", json={"question": "asteroid crater"}).json()
+    top_hit(client, "asteroid crater")
+    state = embeddings._read_current()
+    client.patch(f"/qnas/{q['id']}/bookmark")
+    assert embeddings._read_current() == state
@@ -0,0 +1,55 @@
+def test_sync_returns_only_changes_since_token(client):
+    cat = client.post("/categories/", json={"name": "Sync Basics"}).json()
+    q1 = client.post("/qnas/", json={"question": "What is delta sync?", "category_id": cat["id"]}).json()
+    q2 = client.post("/qnas/", json={"question": "What is a tombstone?", "category_id": cat["id"]}).json()
+
+    full = client.get("/sync").json()
+    assert {q1["id"], q2["id"]} <= {q["id"] for q in full["qnas"]}
+
+    client.patch(f"/qnas/{q1['id']}/bookmark")
+    client.delete(f"/qnas/{q2['id']}")
+
+    res = client.get("/sync", params={"since": full["next_token"]})
+    assert res.status_code == 200
+    data = res.json()
+    assert [q["id"] for q in data["qnas"]] == [q1["id"]]
+    assert data["qnas"][0]["bookmark"] is True
+    assert {"entity": "qna", "entity_id": q2["id"]} in [
+        {"entity": d["entity"], "entity_id": d["entity_id"]} for d in data["deleted"]
+    ]
+
+def test_sync_rejects_bad_token(client):
+    res = client.get("/sync", params={"since": "not-a-token"})
+    assert res.status_code == 400
+
+def test_sync_keeps_rows_flushed_before_a_poll_and_committed_after(client):
+    from db import SessionLocal
+    from models import QnaORM
+    token = client.get("/sync").json()["next_token"]
+
+    with SessionLocal() as s:
+        q = QnaORM(question="Committed after the poll?")
+        s.add(q)
+        s.flush()
+        during = client.get("/sync", params={"since": token}).json()
+        s.commit()
+        qna_id = q.id
+
+    assert qna_id not in [q["id"] for q in during["qnas"]]
+    after = client.get("/sync", params={"since": during["next_token"]}).json()
+    assert qna_id in [q["id"] for q in after["qnas"]]
+
+def test_sync_asks_for_full_resync_past_tombstone_retention(client, monkeypatch):
+    from datetime import timedelta
+    from routers import sync
+    q = client.post("/qnas/", json={"question": "Deleted long ago?"}).json()
+    token = client.get("/sync").json()["next_token"]
+    client.delete(f"/qnas/{q['id']}")
+
+    monkeypatch.setattr(sync, "TOMBSTONE_RETENTION", timedelta(0))
+    monkeypatch.setattr(sync, "_last_prune", {"at": None})
+    data = client.get("/sync", params={"since": token}).json()
+    assert data["full_resync"] is True
+    assert data["deleted"] == []
+    assert q["id"] not in [row["id"] for row in data["qnas"]]
+    assert client.get("/sync", params={"since": data["next_token"]}).json()["full_resync"] is False